@@ -1,8 +1,11 @@
-from flask import Flask, render_template, request, send_file, jsonify
+from flask import Flask, render_template, request, send_file, jsonify, Response
 import os
 import shutil
+import tempfile
+import zipfile
+from concurrent.futures import ThreadPoolExecutor, as_completed
 import fitz
-from pdf_processor import PDFProcessor
+from pdf_processor import PDFProcessor, PAGE_SCANNED
 from utils import is_generic_filename, sanitize_filename
 import time
 
@@ -15,12 +18,121 @@ app.secret_key = 'supersecretkey'
 os.makedirs(app.config['UPLOAD_FOLDER'], exist_ok=True)
 os.makedirs(app.config['PROCESSED_FOLDER'], exist_ok=True)
 
-processor = PDFProcessor()
+# OCR_LANG fixes the Tesseract language; unset routes per page
+processor = PDFProcessor(ocr_lang=os.environ.get('OCR_LANG') or None)
+
+# Documents processed concurrently per /upload_batch request
+BATCH_WORKERS = int(os.environ.get('BATCH_WORKERS', 2))
+# Limits for /upload_batch (ZIP entries are checked before extraction)
+MAX_BATCH_FILES = int(os.environ.get('MAX_BATCH_FILES', 500))
+MAX_BATCH_FILE_SIZE = int(os.environ.get('MAX_BATCH_FILE_SIZE', 200 * 1024 * 1024))
 
 @app.route('/')
 def index():
     return render_template('index.html')
 
+class _ZipStream:
+    """
+    Write-only sink for zipfile; chunks are drained and sent as the ZIP is built.
+    """
+    def __init__(self):
+        self.chunks = []
+
+    def write(self, data):
+        self.chunks.append(bytes(data))
+        return len(data)
+
+    def flush(self):
+        pass
+
+    def drain(self):
+        data = b"".join(self.chunks)
+        self.chunks = []
+        return data
+
+class BlankDocumentError(Exception):
+    """
+    Every page of the document was blank and removed.
+    """
+
+def process_pdf_file(input_path, filename, output_dir, make_searchable=False, enhance_image=False, binarize_image=False):
+    """
+    Runs the full pipeline on one uploaded PDF and saves it to output_dir.
+    Returns the output filename. Raises BlankDocumentError if every page was blank.
+    """
+    doc = fitz.open(input_path)
+    out_doc = fitz.open()
+    try:
+        needs_rename = is_generic_filename(filename)
+        new_title = None
+        new_date = None
+        pages_kept = 0
+        
+        for i, page in enumerate(doc):
+            # Blank Page Removal
+            if processor.detect_blank_page(page):
+                continue
+            
+            # Auto-Rotation
+            rotation, osd_lang = processor.detect_osd(page)
+            if rotation != 0:
+                page.set_rotation(rotation)
+            ocr_lang = processor.route_ocr_lang(page, osd_lang)
+            
+            # Make Searchable (OCR) or just copy
+            target_page = page
+            ocr_doc_ref = None # Keep reference to prevent GC if needed
+            
+            # Only image-only pages are OCR'd; existing text layers are kept as is
+            if make_searchable and processor.classify_page(page) == PAGE_SCANNED:
+                ocr_doc = processor.convert_to_searchable_pdf(page, enhance=enhance_image, binarize=binarize_image, lang=ocr_lang)
+                if ocr_doc:
+                    ocr_doc_ref = ocr_doc
+                    target_page = ocr_doc[0]
+                    out_doc.insert_pdf(ocr_doc)
+                else:
+                    # Fallback if OCR fails
+                    out_doc.insert_pdf(doc, from_page=i, to_page=i)
+            else:
+                out_doc.insert_pdf(doc, from_page=i, to_page=i)
+
+            # Metadata (from first kept page)
+            # Now we use 'target_page' which might be the OCR'd clean page
+            if pages_kept == 0 and needs_rename:
+                t, d = processor.extract_metadata_for_rename(target_page, binarize=binarize_image, lang=ocr_lang)
+                if t: new_title = t
+                if d: new_date = d
+                
+            pages_kept += 1
+        
+        if pages_kept == 0:
+            raise BlankDocumentError('All pages were blank and removed.')
+
+        # Determine Output Name
+        name, ext = os.path.splitext(filename)
+        final_name = f"{name}_processed{ext}"
+        
+        if needs_rename and new_title:
+            sanitized = sanitize_filename(new_title)
+            if new_date:
+                final_name = f"{sanitized}_{new_date}{ext}"
+            else:
+                final_name = f"{sanitized}{ext}"
+        
+        output_filename = final_name
+        out_doc.save(os.path.join(output_dir, output_filename))
+        return output_filename
+    finally:
+        out_doc.close()
+        doc.close()
+
+def get_options():
+    return {
+        'make_searchable': request.form.get('searchable') == 'true',
+        'enhance_image': request.form.get('enhance') == 'true',
+        'binarize_image': request.form.get('binarize') == 'true',
+    }
+
 @app.route('/upload', methods=['POST'])
 def upload_file():
     if 'file' not in request.files:
@@ -37,72 +149,7 @@ def upload_file():
         
         try:
             # Process the file
-            doc = fitz.open(input_path)
-            out_doc = fitz.open()
-            
-            # Get options
-            make_searchable = request.form.get('searchable') == 'true'
-            enhance_image = request.form.get('enhance') == 'true'
-            
-            needs_rename = is_generic_filename(file.filename)
-            new_title = None
-            new_date = None
-            pages_kept = 0
-            
-            for i, page in enumerate(doc):
-                # Blank Page Removal
-                if processor.detect_blank_page(page):
-                    continue
-                
-                # Auto-Rotation
-                rotation = processor.fix_orientation(page)
-                if rotation != 0:
-                    page.set_rotation(rotation)
-                
-                # Make Searchable (OCR) or just copy
-                target_page = page
-                ocr_doc_ref = None # Keep reference to prevent GC if needed
-                
-                if make_searchable:
-                    ocr_doc = processor.convert_to_searchable_pdf(page, enhance=enhance_image)
-                    if ocr_doc:
-                        ocr_doc_ref = ocr_doc
-                        target_page = ocr_doc[0]
-                        out_doc.insert_pdf(ocr_doc)
-                    else:
-                        # Fallback if OCR fails
-                        out_doc.insert_pdf(doc, from_page=i, to_page=i)
-                else:
-                    out_doc.insert_pdf(doc, from_page=i, to_page=i)
-
-                # Metadata (from first kept page)
-                # Now we use 'target_page' which might be the OCR'd clean page
-                if pages_kept == 0 and needs_rename:
-                    t, d = processor.extract_metadata_for_rename(target_page)
-                    if t: new_title = t
-                    if d: new_date = d
-                    
-                pages_kept += 1
-            
-            if pages_kept == 0:
-                 return jsonify({'error': 'All pages were blank and removed.'}), 400
-
-            # Determine Output Name
-            name, ext = os.path.splitext(file.filename)
-            final_name = f"{name}_processed{ext}"
-            
-            if needs_rename and new_title:
-                sanitized = sanitize_filename(new_title)
-                if new_date:
-                    final_name = f"{sanitized}_{new_date}{ext}"
-                else:
-                    final_name = f"{sanitized}{ext}"
-            
-            output_filename = final_name
-            output_path = os.path.join(app.config['PROCESSED_FOLDER'], output_filename)
-            out_doc.save(output_path)
-            out_doc.close()
-            doc.close()
+            output_filename = process_pdf_file(input_path, file.filename, app.config['PROCESSED_FOLDER'], **get_options())
             
             # Clean up input
             os.remove(input_path)
@@ -113,11 +160,141 @@ def upload_file():
                 'download_url': f'/download/{output_filename}'
             })
             
+        except BlankDocumentError as e:
+            return jsonify({'error': str(e)}), 400
         except Exception as e:
             return jsonify({'error': str(e)}), 500
             
     return jsonify({'error': 'Invalid file type'}), 400
 
+@app.route('/upload_batch', methods=['POST'])
+def upload_batch():
+    """
+    Accepts many PDFs and/or ZIP archives of PDFs in one request ('files').
+    Documents are processed in parallel (BATCH_WORKERS) and the results are
+    streamed back as a ZIP, each entry written as soon as its document is done.
+    """
+    files = [f for f in request.files.getlist('files') if f.filename]
+    if not files:
+        return jsonify({'error': 'No selected file'}), 400
+
+    # Uploads must be on disk before the streamed response outlives the request
+    batch_dir = tempfile.mkdtemp(dir=app.config['UPLOAD_FOLDER'])
+    input_dir = os.path.join(batch_dir, 'input')
+    output_dir = os.path.join(batch_dir, 'output')
+    os.makedirs(input_dir)
+    os.makedirs(output_dir)
+
+    inputs = []
+    try:
+        for file in files:
+            if file.filename.lower().endswith('.zip'):
+                with zipfile.ZipFile(file.stream) as archive:
+                    for info in archive.infolist():
+                        if not is_batch_pdf_entry(info):
+                            continue
+                        check_batch_limits(inputs, info.filename, info.file_size)
+                        with archive.open(info) as member:
+                            inputs.append(save_batch_input(input_dir, info.filename, member))
+            elif file.filename.lower().endswith('.pdf'):
+                check_batch_limits(inputs, file.filename)
+                inputs.append(save_batch_input(input_dir, file.filename, file.stream))
+    except zipfile.BadZipFile:
+        shutil.rmtree(batch_dir, ignore_errors=True)
+        return jsonify({'error': 'Invalid ZIP file'}), 400
+    except ValueError as e:
+        shutil.rmtree(batch_dir, ignore_errors=True)
+        return jsonify({'error': str(e)}), 400
+
+    if not inputs:
+        shutil.rmtree(batch_dir, ignore_errors=True)
+        return jsonify({'error': 'Invalid file type'}), 400
+
+    options = get_options()
+
+    def generate():
+        sink = _ZipStream()
+        used_names = set()
+        errors = []
+        executor = ThreadPoolExecutor(max_workers=BATCH_WORKERS)
+        try:
+            # Each document gets its own output directory: two documents renamed
+            # alike must not overwrite each other while they are being zipped
+            futures = {}
+            for path, name in inputs:
+                doc_dir = tempfile.mkdtemp(dir=output_dir)
+                futures[executor.submit(process_pdf_file, path, name, doc_dir, **options)] = (name, doc_dir)
+            # PDFs are already compressed, so entries are stored as is
+            with zipfile.ZipFile(sink, 'w', compression=zipfile.ZIP_STORED) as archive:
+                for future in as_completed(futures):
+                    name, doc_dir = futures[future]
+                    try:
+                        output_filename = future.result()
+                    except BlankDocumentError as e:
+                        errors.append(f"{name}: {e}")
+                        continue
+                    except Exception as e:
+                        # The raw error names server temp paths; log it, report the upload name
+                        app.logger.error(f"Batch processing of {name} failed: {e}")
+                        errors.append(f"{name}: Could not be processed (damaged or unsupported PDF)")
+                        continue
+                    entry_name = unique_name(output_filename, used_names)
+                    archive.write(os.path.join(doc_dir, output_filename), entry_name)
+                    shutil.rmtree(doc_dir, ignore_errors=True)
+                    yield sink.drain()
+                if errors:
+                    archive.writestr('errors.txt', "\n".join(errors))
+            yield sink.drain()
+        finally:
+            executor.shutdown(cancel_futures=True)
+            shutil.rmtree(batch_dir, ignore_errors=True)
+
+    return Response(generate(), mimetype='application/zip',
+                    headers={'Content-Disposition': 'attachment; filename=processed.zip'})
+
+def is_batch_pdf_entry(info):
+    """
+    True for the PDFs in an uploaded ZIP; skips directories, macOS metadata
+    (__MACOSX/, ._*) and other hidden files.
+    """
+    basename = os.path.basename(info.filename)
+    return (not info.is_dir()
+            and not info.filename.startswith('__MACOSX/')
+            and not basename.startswith('.')
+            and basename.lower().endswith('.pdf'))
+
+def check_batch_limits(inputs, filename, size=0):
+    """
+    Raises ValueError if adding filename (of the given size) exceeds the batch limits.
+    """
+    if len(inputs) >= MAX_BATCH_FILES:
+        raise ValueError(f'Too many files (limit {MAX_BATCH_FILES})')
+    if size > MAX_BATCH_FILE_SIZE:
+        raise ValueError(f'{filename} is too large (limit {MAX_BATCH_FILE_SIZE // (1024 * 1024)} MB)')
+
+def save_batch_input(input_dir, filename, stream):
+    """
+    Copies one batch input from a file object to a unique path.
+    Returns (path, original basename).
+    """
+    fd, path = tempfile.mkstemp(suffix='.pdf', dir=input_dir)
+    with os.fdopen(fd, 'wb') as f:
+        shutil.copyfileobj(stream, f)
+    return path, os.path.basename(filename)
+
+def unique_name(filename, used_names):
+    """
+    Avoids duplicate entries in the output ZIP (e.g. two docs renamed alike).
+    """
+    name, ext = os.path.splitext(filename)
+    candidate = filename
+    n = 2
+    while candidate in used_names:
+        candidate = f"{name} ({n}){ext}"
+        n += 1
+    used_names.add(candidate)
+    return candidate
+
 @app.route('/download/<filename>')
 def download_file(filename):
     return send_file(os.path.join(app.config['PROCESSED_FOLDER'], filename), as_attachment=True)
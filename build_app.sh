@@ -17,21 +17,20 @@ on open inputFiles
     set venvPython to appDir & "/venv/bin/python3"
     set mainScript to appDir & "/main.py"
     
-    -- Loop through dropped files
+    -- Build a single command for all dropped files (one interpreter startup;
+    -- main.py hands the batch to the resident daemon if one is running)
+    set cmd to quoted form of venvPython & " " & quoted form of mainScript
     repeat with aFile in inputFiles
-        set filePath to POSIX path of aFile
-        
-        -- Build command
-        set cmd to quoted form of venvPython & " " & quoted form of mainScript & " " & quoted form of filePath
-        
-        try
-            -- Execute command
-            do shell script cmd
-        on error errMsg
-            display dialog "処理中にエラーが発生しました:\n" & errMsg buttons {"OK"} icon stop
-        end try
+        set cmd to cmd & " " & quoted form of (POSIX path of aFile)
     end repeat
     
+    try
+        -- Execute command
+        do shell script cmd
+    on error errMsg
+        display dialog "処理中にエラーが発生しました:\n" & errMsg buttons {"OK"} icon stop
+    end try
+    
     display notification "ファイルの処理が完了しました" with title "PDF便利ツール" sound name "Glass"
 end open
 
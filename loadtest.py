@@ -0,0 +1,304 @@
+import argparse
+import itertools
+import json
+import os
+import random
+import shlex
+import subprocess
+import sys
+import threading
+import time
+import urllib.error
+import urllib.request
+import uuid
+from concurrent.futures import ThreadPoolExecutor
+import fitz
+from benchmark_ocr import create_scanned_page
+
+# Load generator for the Flask upload service.
+# Starts gunicorn with the given workers/threads (or targets --url), replays a
+# mix of generated PDFs against /upload and reports throughput, latency
+# percentiles, error/timeout rates and server RSS over time.
+#
+# Usage:
+#   python loadtest.py --workers 1 --threads 4 --concurrency 4 --duration 60
+#   python loadtest.py --workers 2 --threads 2 --rate 0.5 --duration 120
+#   python loadtest.py --url http://localhost:5555 --pid 1234 --concurrency 2
+
+def create_born_digital_pdf(pages):
+    doc = fitz.open()
+    for n in range(pages):
+        page = doc.new_page()
+        page.insert_text((50, 100), f"Quarterly Report Section {n + 1}", fontsize=24)
+        page.insert_text((50, 140), "Date: 2024-05-20", fontsize=12)
+        for line in range(30):
+            page.insert_text((50, 180 + line * 18), f"Line {line}: pressure readings stayed in range.", fontsize=11)
+    return doc.tobytes()
+
+def create_scanned_pdf(pages):
+    doc = fitz.open()
+    for seed in range(pages):
+        create_scanned_page(doc, seed)
+    return doc.tobytes()
+
+def build_corpus(small_pages, large_pages):
+    """
+    Every combination of scanned/born-digital, small/large and the
+    searchable/enhance toggles. Returns a list of request profiles.
+    """
+    documents = {}
+    for kind, size in itertools.product(["scanned", "born_digital"], ["small", "large"]):
+        pages = small_pages if size == "small" else large_pages
+        create = create_scanned_pdf if kind == "scanned" else create_born_digital_pdf
+        documents[(kind, size)] = create(pages)
+
+    corpus = []
+    for (kind, size), data in documents.items():
+        for searchable, enhance in itertools.product([True, False], repeat=2):
+            corpus.append({
+                "name": f"{kind}/{size}/{'ocr' if searchable else 'noocr'}/{'enh' if enhance else 'raw'}",
+                "data": data,
+                "searchable": searchable,
+                "enhance": enhance,
+            })
+    return corpus
+
+def encode_multipart(fields, filename, data):
+    boundary = uuid.uuid4().hex
+    parts = []
+    for key, value in fields.items():
+        parts.append(f'--{boundary}\r\nContent-Disposition: form-data; name="{key}"\r\n\r\n{value}\r\n'.encode())
+    parts.append(f'--{boundary}\r\nContent-Disposition: form-data; name="file"; filename="{filename}"\r\n'
+                 f'Content-Type: application/pdf\r\n\r\n'.encode())
+    parts.append(data)
+    parts.append(f'\r\n--{boundary}--\r\n'.encode())
+    return b"".join(parts), f"multipart/form-data; boundary={boundary}"
+
+class LoadTest:
+    def __init__(self, url, corpus, timeout, seed=0):
+        self.url = url.rstrip("/")
+        self.corpus = corpus
+        self.timeout = timeout
+        self.random = random.Random(seed)
+        self.lock = threading.Lock()
+        self.counter = itertools.count()
+        self.results = [] # (profile name, status, latency seconds)
+
+    def send(self, scheduled=None):
+        """
+        Sends one upload. Latency is measured from the scheduled time when
+        given (open-loop mode), so queueing delay in the client is included.
+        """
+        with self.lock:
+            profile = self.random.choice(self.corpus)
+        # Unique generic name: exercises renaming and avoids upload path clashes
+        filename = f"IMG_{next(self.counter):06d}.pdf"
+        body, content_type = encode_multipart(
+            {"searchable": str(profile["searchable"]).lower(), "enhance": str(profile["enhance"]).lower()},
+            filename, profile["data"])
+        request = urllib.request.Request(f"{self.url}/upload", data=body, headers={"Content-Type": content_type})
+
+        start = scheduled or time.perf_counter()
+        try:
+            with urllib.request.urlopen(request, timeout=self.timeout) as response:
+                response.read()
+                status = "ok"
+        except urllib.error.HTTPError as e:
+            status = f"http_{e.code}"
+        except (TimeoutError, OSError) as e:
+            status = "timeout" if "timed out" in str(e) else "error"
+        latency = time.perf_counter() - start
+
+        with self.lock:
+            self.results.append((profile["name"], status, latency))
+
+    def run_closed_loop(self, concurrency, duration):
+        deadline = time.perf_counter() + duration
+
+        def worker():
+            while time.perf_counter() < deadline:
+                self.send()
+
+        threads = [threading.Thread(target=worker) for _ in range(concurrency)]
+        for t in threads:
+            t.start()
+        for t in threads:
+            t.join()
+
+    def run_open_loop(self, rate, duration, max_in_flight):
+        start = time.perf_counter()
+        with ThreadPoolExecutor(max_workers=max_in_flight) as executor:
+            for n in itertools.count():
+                scheduled = start + n / rate
+                if scheduled - start >= duration:
+                    break
+                time.sleep(max(0, scheduled - time.perf_counter()))
+                executor.submit(self.send, scheduled)
+
+class RSSSampler:
+    """
+    Samples the resident memory of a process and all its descendants
+    (gunicorn master + workers) using `ps`, which works on Linux and macOS.
+    """
+    def __init__(self, pid, interval):
+        self.pid = pid
+        self.interval = interval
+        self.samples = [] # (seconds since start, MB)
+        self.stop_event = threading.Event()
+        self.thread = threading.Thread(target=self._run, daemon=True)
+
+    def tree_rss_mb(self):
+        out = subprocess.run(["ps", "-A", "-o", "pid=,ppid=,rss="], capture_output=True, text=True).stdout
+        children = {}
+        rss = {}
+        for line in out.splitlines():
+            pid, ppid, kb = (int(v) for v in line.split())
+            children.setdefault(ppid, []).append(pid)
+            rss[pid] = kb
+        total = 0
+        stack = [self.pid]
+        while stack:
+            pid = stack.pop()
+            total += rss.get(pid, 0)
+            stack.extend(children.get(pid, []))
+        return total / 1024
+
+    def _run(self):
+        start = time.perf_counter()
+        while not self.stop_event.is_set():
+            self.samples.append((time.perf_counter() - start, self.tree_rss_mb()))
+            self.stop_event.wait(self.interval)
+
+    def start(self):
+        self.thread.start()
+
+    def stop(self):
+        self.stop_event.set()
+        self.thread.join()
+
+def start_server(args):
+    cmd = (f"gunicorn --bind 127.0.0.1:{args.port} --workers {args.workers} "
+           f"--threads {args.threads} --timeout {int(args.timeout)} app:app")
+    print(f"Starting: {cmd}")
+    server = subprocess.Popen(shlex.split(cmd), cwd=os.path.dirname(os.path.abspath(__file__)),
+                              stdout=subprocess.DEVNULL, stderr=subprocess.DEVNULL)
+    url = f"http://127.0.0.1:{args.port}"
+    for _ in range(60):
+        try:
+            urllib.request.urlopen(url, timeout=1).read()
+            return server, url
+        except OSError:
+            if server.poll() is not None:
+                sys.exit("Server exited during startup.")
+            time.sleep(0.5)
+    server.terminate()
+    sys.exit("Server did not become ready.")
+
+def percentile(values, p):
+    values = sorted(values)
+    if not values:
+        return float("nan")
+    index = min(len(values) - 1, max(0, round(p / 100 * (len(values) - 1))))
+    return values[index]
+
+def summarize(results, elapsed, rss_samples):
+    latencies = [lat for _, status, lat in results if status == "ok"]
+    total = len(results)
+    statuses = {}
+    for _, status, _ in results:
+        statuses[status] = statuses.get(status, 0) + 1
+
+    report = {
+        "requests": total,
+        "elapsed_s": elapsed,
+        "throughput_rps": len(latencies) / elapsed if elapsed else 0,
+        "latency_s": {f"p{p}": percentile(latencies, p) for p in (50, 90, 95, 99)},
+        "error_rate": sum(n for s, n in statuses.items() if s not in ("ok", "timeout")) / total if total else 0,
+        "timeout_rate": statuses.get("timeout", 0) / total if total else 0,
+        "statuses": statuses,
+        "per_profile_p50_s": {},
+        "rss_mb": rss_samples,
+    }
+    for name in sorted({name for name, _, _ in results}):
+        lats = [lat for n, status, lat in results if n == name and status == "ok"]
+        report["per_profile_p50_s"][name] = percentile(lats, 50)
+    return report
+
+def print_report(report):
+    print(f"\nRequests: {report['requests']} in {report['elapsed_s']:.1f}s")
+    print(f"Throughput: {report['throughput_rps']:.2f} req/s (successful)")
+    print("Latency:  " + "  ".join(f"{k}={v:.2f}s" for k, v in report["latency_s"].items()))
+    print(f"Errors: {report['error_rate']:.1%}  Timeouts: {report['timeout_rate']:.1%}  {report['statuses']}")
+
+    print("\nMedian latency by profile:")
+    for name, p50 in report["per_profile_p50_s"].items():
+        print(f"  {name:<32} {p50:7.2f}s")
+
+    samples = report["rss_mb"]
+    if samples:
+        print(f"\nServer RSS: start={samples[0][1]:.0f}MB  peak={max(mb for _, mb in samples):.0f}MB  "
+              f"end={samples[-1][1]:.0f}MB")
+        step = max(1, len(samples) // 20)
+        for t, mb in samples[::step]:
+            print(f"  {t:6.1f}s {mb:7.0f}MB {'#' * int(mb / 20)}")
+
+def main():
+    parser = argparse.ArgumentParser(description="Load test for the PDF upload service")
+    parser.add_argument("--url", help="Target an already running server instead of starting gunicorn")
+    parser.add_argument("--pid", type=int, help="Server PID for RSS sampling when using --url")
+    parser.add_argument("--port", type=int, default=5601)
+    parser.add_argument("--workers", type=int, default=1, help="gunicorn workers")
+    parser.add_argument("--threads", type=int, default=4, help="gunicorn threads per worker")
+    parser.add_argument("--concurrency", type=int, default=4, help="Closed-loop clients (ignored with --rate)")
+    parser.add_argument("--rate", type=float, help="Open-loop target request rate (req/s)")
+    parser.add_argument("--max-in-flight", type=int, default=64, help="Client cap in open-loop mode")
+    parser.add_argument("--duration", type=float, default=60, help="Seconds to generate load")
+    parser.add_argument("--timeout", type=float, default=120, help="Per-request timeout (s)")
+    parser.add_argument("--small-pages", type=int, default=1)
+    parser.add_argument("--large-pages", type=int, default=10)
+    parser.add_argument("--rss-interval", type=float, default=1.0)
+    parser.add_argument("--seed", type=int, default=0)
+    parser.add_argument("--json", help="Also write the report to this file")
+    args = parser.parse_args()
+
+    print("Generating corpus...")
+    corpus = build_corpus(args.small_pages, args.large_pages)
+
+    server = None
+    if args.url:
+        url, pid = args.url, args.pid
+    else:
+        server, url = start_server(args)
+        pid = server.pid
+
+    sampler = RSSSampler(pid, args.rss_interval) if pid else None
+    if sampler:
+        sampler.start()
+
+    test = LoadTest(url, corpus, args.timeout, args.seed)
+    mode = f"rate={args.rate}/s" if args.rate else f"concurrency={args.concurrency}"
+    print(f"Running {mode} for {args.duration:.0f}s against {url}")
+    start = time.perf_counter()
+    try:
+        if args.rate:
+            test.run_open_loop(args.rate, args.duration, args.max_in_flight)
+        else:
+            test.run_closed_loop(args.concurrency, args.duration)
+    finally:
+        elapsed = time.perf_counter() - start
+        if sampler:
+            sampler.stop()
+        if server:
+            server.terminate()
+            server.wait()
+
+    report = summarize(test.results, elapsed, sampler.samples if sampler else [])
+    report["config"] = {k: v for k, v in vars(args).items() if k != "json"}
+    print_report(report)
+
+    if args.json:
+        with open(args.json, "w") as f:
+            json.dump(report, f, indent=2)
+
+if __name__ == "__main__":
+    main()
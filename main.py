@@ -1,8 +1,13 @@
 import os
 import sys
 import argparse
-import fitz
-from pdf_processor import PDFProcessor
+import json
+import socket
+import socketserver
+import tempfile
+from collections import deque
+from concurrent.futures import Future
+from pipeline import PrefetchReader, BackgroundWriter
 from utils import is_generic_filename, sanitize_filename
 import logging
 import shutil
@@ -10,11 +15,30 @@ import shutil
 logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(levelname)s - %(message)s')
 logger = logging.getLogger(__name__)
 
-def process_single_pdf(filepath, processor, dry_run=False):
+# Socket used by the resident daemon (override with PDF_TOOL_SOCKET)
+DEFAULT_SOCKET = os.environ.get(
+    "PDF_TOOL_SOCKET", os.path.join(tempfile.gettempdir(), "pdf_tool.sock")
+)
+
+# fitz / pytesseract / PIL are imported lazily so that the thin client
+# (which only talks to the daemon) starts without loading them.
+def create_processor(ocr_lang=None):
+    from pdf_processor import PDFProcessor
+    return PDFProcessor(ocr_lang=ocr_lang)
+
+def process_single_pdf(filepath, processor, dry_run=False, data=None, writer=None):
+    """
+    Processes one PDF and saves the result next to the original.
+    data: file contents already read into memory (prefetched).
+    writer: BackgroundWriter to hand the save to instead of saving inline.
+    Returns the output path (or the would-be path on dry run), None on failure.
+    With a writer, returns the writer's Future of the output path instead.
+    """
+    import fitz
     logger.info(f"Processing: {filepath}")
     
     try:
-        doc = fitz.open(filepath)
+        doc = fitz.open("pdf", data) if data else fitz.open(filepath)
         out_doc = fitz.open() # Create new PDF
         
         needs_rename = is_generic_filename(os.path.basename(filepath))
@@ -29,14 +53,17 @@ def process_single_pdf(filepath, processor, dry_run=False):
                 logger.info(f"  Page {i+1} removed (blank).")
                 continue
                 
+            # One OSD pass gives both the rotation and the script
+            rotation, osd_lang = processor.detect_osd(page)
+
             # 2. Extract Metadata (only from first *kept* page)
             if pages_kept == 0 and needs_rename:
-                t, d = processor.extract_metadata_for_rename(page)
+                lang = processor.route_ocr_lang(page, osd_lang)
+                t, d = processor.extract_metadata_for_rename(page, lang=lang)
                 if t: new_title = t
                 if d: new_date = d
             
             # 3. Auto-Rotation
-            rotation = processor.fix_orientation(page)
             if rotation != 0:
                 logger.info(f"  Page {i+1} rotated {rotation} degrees.")
                 page.set_rotation(rotation)
@@ -47,7 +74,7 @@ def process_single_pdf(filepath, processor, dry_run=False):
             
         if pages_kept == 0:
             logger.warning(f"  All pages removed from {filepath}. Skipping save.")
-            return
+            return None
 
         # Determine output filename
         dirname = os.path.dirname(filepath)
@@ -67,35 +94,241 @@ def process_single_pdf(filepath, processor, dry_run=False):
         
         output_path = os.path.join(dirname, final_name)
         
-        if not dry_run:
+        if dry_run:
+            logger.info(f"[DRY RUN] Would save to: {output_path}")
+        elif writer:
+            return writer.submit(output_path, out_doc.tobytes(),
+                                 on_done=lambda path: logger.info(f"Saved to: {path}"))
+        else:
             out_doc.save(output_path)
             logger.info(f"Saved to: {output_path}")
-        else:
-            logger.info(f"[DRY RUN] Would save to: {output_path}")
+        return output_path
             
     except Exception as e:
         logger.error(f"Failed to process {filepath}: {e}")
+        return None
+
+def process_batch(paths, processor, dry_run=False, prefetch=2):
+    """
+    Processes paths as a pipeline: the next inputs are read in the background
+    and outputs are saved in the background, overlapping disk/network I/O
+    with OCR. Yields (path, output_path) in input order once each output is
+    saved; output_path is None if processing or saving failed.
+    """
+    writer = None if dry_run else BackgroundWriter()
+    reader = PrefetchReader(paths, prefetch)
+    results = deque() # (path, output path or Future of it), oldest first
+
+    def finished(block):
+        while results:
+            path, output = results[0]
+            if isinstance(output, Future):
+                if not (block or output.done()):
+                    return
+                output = output.result()
+            results.popleft()
+            yield path, output
+
+    try:
+        for path, data in reader:
+            results.append((path, process_single_pdf(path, processor, dry_run, data=data, writer=writer)))
+            yield from finished(block=False)
+        yield from finished(block=True)
+    finally:
+        reader.close()
+        if writer:
+            writer.close()
+
+def collect_pdf_paths(targets):
+    """
+    Expands files and directories into a flat list of absolute PDF paths.
+    """
+    paths = []
+    for target in targets:
+        if os.path.isfile(target):
+            if target.lower().endswith(".pdf"):
+                paths.append(os.path.abspath(target))
+        elif os.path.isdir(target):
+            for root, _, files in os.walk(target):
+                for file in files:
+                    if file.lower().endswith(".pdf"):
+                        paths.append(os.path.abspath(os.path.join(root, file)))
+        else:
+            logger.error(f"Invalid path provided: {target}")
+    return paths
+
+# --- Daemon mode ---
+# Protocol: the client sends one JSON line {"paths": [...], "dry_run": bool}.
+# The daemon acknowledges with {"accepted": n}, then answers with one JSON
+# line per file as it finishes ({"path", "output"}) followed by {"done": true}.
+# Malformed requests get a single {"error": ...} line.
+
+# Seconds a client may wait for the daemon's acknowledgement before it gives
+# up and processes in-process (the daemon may be busy or wedged)
+DAEMON_REPLY_TIMEOUT = 5
+
+class PDFRequestHandler(socketserver.StreamRequestHandler):
+    # Socket timeout: a client that never sends its request (or stops reading
+    # results) must not block the single-threaded daemon
+    timeout = 30
+
+    def handle(self):
+        try:
+            line = self.rfile.readline()
+        except (TimeoutError, ConnectionResetError):
+            return
+        if not line.strip():
+            return # Connection probe (is_daemon_running) or empty request
+
+        try:
+            request = json.loads(line.decode("utf-8"))
+        except ValueError as e:
+            self._send({"error": f"Bad request: {e}"})
+            return
+
+        paths = request.get("paths") if isinstance(request, dict) else None
+        if not isinstance(paths, list) or not all(isinstance(p, str) for p in paths):
+            self._send({"error": "Bad request: 'paths' must be a list of strings"})
+            return
+        if not self._send({"accepted": len(paths)}):
+            return
+
+        batch = process_batch(paths, self.server.processor, bool(request.get("dry_run", False)))
+        try:
+            for path, output in batch:
+                if not self._send({"path": path, "output": output}):
+                    logger.warning("Client disconnected. Aborting batch.")
+                    return
+            self._send({"done": True})
+        except Exception as e:
+            logger.error(f"Batch failed: {e}")
+            self._send({"error": f"Batch failed: {e}"})
+        finally:
+            batch.close() # Stops prefetching and flushes pending saves
+
+    def _send(self, message):
+        """
+        Returns False if the client has gone away.
+        """
+        try:
+            self.wfile.write((json.dumps(message, ensure_ascii=False) + "\n").encode("utf-8"))
+            self.wfile.flush()
+            return True
+        except (BrokenPipeError, ConnectionResetError, TimeoutError):
+            return False
+
+class PDFDaemon(socketserver.UnixStreamServer):
+    # Requests are served one at a time; PyMuPDF documents are not thread-safe
+    # and concurrent clients simply wait in the listen backlog.
+    def __init__(self, socket_path, processor):
+        self.processor = processor
+        super().__init__(socket_path, PDFRequestHandler)
+
+def run_daemon(socket_path=DEFAULT_SOCKET, ocr_lang=None):
+    if not hasattr(socket, "AF_UNIX"):
+        logger.error("Daemon mode requires Unix domain sockets.")
+        return
+
+    if os.path.exists(socket_path):
+        if is_daemon_running(socket_path):
+            logger.error(f"Daemon already running on {socket_path}")
+            return
+        os.remove(socket_path) # Stale socket from a crashed daemon
+
+    processor = create_processor(ocr_lang)
+    server = PDFDaemon(socket_path, processor)
+    logger.info(f"Daemon listening on {socket_path}. Press Ctrl+C to stop.")
+    try:
+        server.serve_forever()
+    except KeyboardInterrupt:
+        pass
+    finally:
+        server.server_close()
+        os.remove(socket_path)
+
+def is_daemon_running(socket_path=DEFAULT_SOCKET):
+    if not hasattr(socket, "AF_UNIX"):
+        return False
+    try:
+        with socket.socket(socket.AF_UNIX, socket.SOCK_STREAM) as sock:
+            sock.connect(socket_path)
+        return True
+    except OSError:
+        return False
+
+def submit_to_daemon(paths, dry_run=False, socket_path=DEFAULT_SOCKET):
+    """
+    Sends paths to a running daemon and logs results as they stream back.
+    Returns False if no daemon is reachable or it does not acknowledge the
+    request within DAEMON_REPLY_TIMEOUT (caller should run in-process).
+    """
+    if not hasattr(socket, "AF_UNIX"):
+        return False
+    sock = socket.socket(socket.AF_UNIX, socket.SOCK_STREAM)
+    sock.settimeout(DAEMON_REPLY_TIMEOUT)
+    try:
+        sock.connect(socket_path)
+    except OSError:
+        sock.close()
+        return False
+
+    with sock, sock.makefile("rwb") as stream:
+        try:
+            request = {"paths": paths, "dry_run": dry_run}
+            stream.write((json.dumps(request, ensure_ascii=False) + "\n").encode("utf-8"))
+            stream.flush()
+            reply = json.loads(stream.readline().decode("utf-8"))
+        except (OSError, ValueError) as e:
+            logger.warning(f"Daemon did not respond ({e}). Processing in-process.")
+            return False
+        if "error" in reply:
+            logger.error(f"Daemon error: {reply['error']}")
+            return True
+
+        sock.settimeout(None) # OCR of a single file may take minutes
+        for line in stream:
+            message = json.loads(line.decode("utf-8"))
+            if message.get("done"):
+                break
+            if "error" in message:
+                logger.error(f"Daemon error: {message['error']}")
+                break
+            if message["output"]:
+                logger.info(f"{message['path']} -> {message['output']}")
+            else:
+                logger.warning(f"{message['path']} was not saved (see daemon log).")
+    return True
 
 def main():
     parser = argparse.ArgumentParser(description="PDF Convenience Tool")
-    parser.add_argument("path", help="Path to PDF file or directory")
+    parser.add_argument("path", nargs="*", help="Path(s) to PDF files or directories")
     parser.add_argument("--dry-run", action="store_true", help="Simulate without saving files")
+    parser.add_argument("--daemon", action="store_true", help="Run as a resident daemon on a Unix socket")
+    parser.add_argument("--no-daemon", action="store_true", help="Always process in this process")
+    parser.add_argument("--socket", default=DEFAULT_SOCKET, help="Daemon socket path")
+    parser.add_argument("--lang", help="Fixed Tesseract language (e.g. jpn+eng); default routes per page")
     
     args = parser.parse_args()
     
-    processor = PDFProcessor()
+    if args.daemon:
+        run_daemon(args.socket, args.lang)
+        return
     
-    target = args.path
-    if os.path.isfile(target):
-        if target.lower().endswith(".pdf"):
-            process_single_pdf(target, processor, args.dry_run)
-    elif os.path.isdir(target):
-        for root, _, files in os.walk(target):
-            for file in files:
-                if file.lower().endswith(".pdf"):
-                    process_single_pdf(os.path.join(root, file), processor, args.dry_run)
-    else:
-        logger.error("Invalid path provided.")
+    if not args.path:
+        parser.error("at least one path is required")
+
+    paths = collect_pdf_paths(args.path)
+    if not paths:
+        return
+
+    # A running daemon uses the --lang it was started with
+    if not args.no_daemon and not args.lang and submit_to_daemon(paths, args.dry_run, args.socket):
+        return
+
+    # No daemon running: fall back to in-process execution
+    processor = create_processor(args.lang)
+    for _ in process_batch(paths, processor, args.dry_run):
+        pass
 
 if __name__ == "__main__":
     main()
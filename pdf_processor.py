@@ -1,7 +1,9 @@
 import fitz  # PyMuPDF
 import pytesseract
 from PIL import Image, ImageOps # Added ImageOps
+import numpy as np
 import io
+import math
 import re
 import statistics
 import logging
@@ -9,9 +11,71 @@ import logging
 logging.basicConfig(level=logging.INFO)
 logger = logging.getLogger(__name__)
 
+# OCR language routing
+DEFAULT_OCR_LANG = 'jpn+eng'
+CJK_PATTERN = re.compile(r'[\u3040-\u30ff\u3400-\u4dbf\u4e00-\u9fff\uff66-\uff9f]')
+LATIN_PATTERN = re.compile(r'[A-Za-z]')
+CJK_SCRIPTS = {'Japanese', 'Han', 'Hiragana', 'Katakana'}
+MIN_ROUTING_CHARS = 10
+MIN_SCRIPT_CONF = 1.0
+
+# Page classification (decides which pages need OCR)
+PAGE_BORN_DIGITAL = 'born_digital'
+PAGE_SCANNED = 'scanned'
+PAGE_MIXED = 'mixed'
+MIN_TEXT_CHARS = 20
+IMAGE_PAGE_FRACTION = 0.5
+MIN_TEXT_COVERAGE = 0.05 # below this, an image-dominant page is a scan with a stamp
+
+# Tiled rendering: pages whose raster exceeds the pixel budget are
+# rendered, blank-checked and OCR'd in overlapping clip tiles
+TILE_PIXEL_BUDGET = 10_000_000 # ~30 MB per RGB OCR tile, ~10 MB per grayscale tile
+TILE_OVERLAP = 96 # points; words narrower than this are never lost at tile seams
+
 class PDFProcessor:
-    def __init__(self):
-        pass
+    def __init__(self, ocr_lang=None, tile_pixel_budget=TILE_PIXEL_BUDGET):
+        # Fixed Tesseract language (e.g. 'jpn+eng'); None routes per page
+        self.ocr_lang = ocr_lang
+        self.tile_pixel_budget = tile_pixel_budget
+
+    def is_oversized(self, page, dpi):
+        zoom = dpi / 72
+        return page.rect.width * zoom * page.rect.height * zoom > self.tile_pixel_budget
+
+    def fit_dpi(self, page, dpi):
+        """
+        Lowers dpi so that a full-page render stays within the pixel budget.
+        """
+        if not self.is_oversized(page, dpi):
+            return dpi
+        return 72 * math.sqrt(self.tile_pixel_budget / abs(page.rect))
+
+    def tile_rects(self, page, dpi, overlap=TILE_OVERLAP):
+        """
+        Splits page.rect into (tile, core) rects whose renders fit the pixel budget.
+        Tiles overlap by `overlap` points; the cores partition the page, so a
+        word is kept only by the tile whose core contains its center.
+        """
+        rect = page.rect
+        if not self.is_oversized(page, dpi):
+            return [(rect, rect)]
+
+        side = math.sqrt(self.tile_pixel_budget) / (dpi / 72) # tile edge in points
+        step = max(side - overlap, side / 2)
+        cols = math.ceil(rect.width / step)
+        rows = math.ceil(rect.height / step)
+        core_w = rect.width / cols
+        core_h = rect.height / rows
+
+        tiles = []
+        for row in range(rows):
+            for col in range(cols):
+                core = fitz.Rect(rect.x0 + col * core_w, rect.y0 + row * core_h,
+                                 rect.x0 + (col + 1) * core_w, rect.y0 + (row + 1) * core_h)
+                tile = fitz.Rect(core.x0 - overlap / 2, core.y0 - overlap / 2,
+                                 core.x1 + overlap / 2, core.y1 + overlap / 2) & rect
+                tiles.append((tile, core))
+        return tiles
 
     def enhance_page_image(self, image):
         """
@@ -27,22 +91,190 @@ class PDFProcessor:
             logger.warning(f"Image enhancement failed: {e}")
             return image
 
-    def convert_to_searchable_pdf(self, page, enhance=False):
+    def binarize_page_image(self, image, window=25, k=0.2, r=128.0, step=4):
+        """
+        Sauvola adaptive binarization using integral images in NumPy.
+        Local statistics are computed on a grid decimated by `step` (the
+        threshold surface is smooth at this window size). Returns a 1-bit
+        image for Tesseract; most of the OCR speedup comes from handing it
+        a far smaller PNG than the RGB render, not from this step itself.
+        """
+        try:
+            gray = image.convert("L")
+            pixels = np.asarray(gray, dtype=np.float32)
+
+            # Block means of I and I^2 (Pillow's reduce is a C box filter)
+            block_mean = np.asarray(gray.convert("F").reduce(step), dtype=np.float64)
+            block_sq = np.asarray(Image.fromarray(pixels * pixels).reduce(step), dtype=np.float64)
+
+            win = max(1, window // step) | 1 # odd window, in blocks
+            pad = win // 2
+            h, w = block_mean.shape
+
+            def window_mean(a):
+                # Integral image with a leading zero row/column
+                padded = np.pad(a, pad, mode="reflect" if min(h, w) > pad else "edge")
+                ii = np.pad(padded.cumsum(0).cumsum(1), ((1, 0), (1, 0)))
+                total = (ii[win:win + h, win:win + w] - ii[:h, win:win + w]
+                         - ii[win:win + h, :w] + ii[:h, :w])
+                return total / (win * win)
+
+            mean = window_mean(block_mean)
+            std = np.sqrt(np.maximum(window_mean(block_sq) - mean ** 2, 0))
+
+            # Sauvola threshold: T = m * (1 + k * (s / R - 1))
+            threshold = (mean * (1.0 + k * (std / r - 1.0))).astype(np.float32)
+            threshold = np.repeat(np.repeat(threshold, step, 0), step, 1)
+            threshold = threshold[:pixels.shape[0], :pixels.shape[1]]
+
+            return Image.fromarray(pixels > threshold) # bool -> mode "1"
+        except Exception as e:
+            logger.warning(f"Image binarization failed: {e}")
+            return image
+
+    def render_ocr_image(self, page, dpi=150, binarize=False, enhance=False, clip=None):
+        """
+        Renders a page (or the clip area of it) for Tesseract. Binarization
+        renders in grayscale (1/3 of the RGB data) and hands over a 1-bit image.
+        """
+        if binarize:
+            pix = page.get_pixmap(dpi=dpi, colorspace=fitz.csGRAY, clip=clip)
+            img = Image.frombytes("L", [pix.width, pix.height], pix.samples)
+            return self.binarize_page_image(img)
+
+        pix = page.get_pixmap(dpi=dpi, clip=clip)
+        img = Image.frombytes("RGB", [pix.width, pix.height], pix.samples)
+        if enhance:
+            img = self.enhance_page_image(img)
+        return img
+
+    def ocr_page_data(self, page, lang, dpi=150, binarize=False, enhance=False):
+        """
+        Runs Tesseract layout analysis on a page, tile by tile if it is oversized.
+        Returns (data, height): an image_to_data dict in full-page pixel
+        coordinates at dpi, and the page height in those pixels.
+        """
+        zoom = dpi / 72
+        rect = page.rect
+        if not self.is_oversized(page, dpi):
+            img = self.render_ocr_image(page, dpi=dpi, binarize=binarize, enhance=enhance)
+            return pytesseract.image_to_data(img, output_type=pytesseract.Output.DICT, lang=lang), img.height
+
+        tiles = self.tile_rects(page, dpi)
+        logger.info(f"  Oversized page: OCR in {len(tiles)} tiles")
+        keys = ['text', 'conf', 'left', 'top', 'width', 'height', 'block_num', 'par_num', 'line_num']
+        merged = {key: [] for key in keys}
+        for n, (tile, core) in enumerate(tiles):
+            img = self.render_ocr_image(page, dpi=dpi, binarize=binarize, enhance=enhance, clip=tile)
+            data = pytesseract.image_to_data(img, output_type=pytesseract.Output.DICT, lang=lang)
+            del img
+
+            for i in range(len(data['text'])):
+                # Tile pixels -> page points
+                x0 = tile.x0 + data['left'][i] / zoom
+                y0 = tile.y0 + data['top'][i] / zoom
+                w = data['width'][i] / zoom
+                h = data['height'][i] / zoom
+                # Drop duplicates from the overlaps: keep the tile owning the center
+                if not core.contains(fitz.Point(x0 + w / 2, y0 + h / 2)):
+                    continue
+
+                merged['text'].append(data['text'][i])
+                merged['conf'].append(data['conf'][i])
+                merged['left'].append(round((x0 - rect.x0) * zoom))
+                merged['top'].append(round((y0 - rect.y0) * zoom))
+                merged['width'].append(round(data['width'][i]))
+                merged['height'].append(round(data['height'][i]))
+                # Keep line ids unique across tiles
+                merged['block_num'].append(n * 10000 + data['block_num'][i])
+                merged['par_num'].append(data['par_num'][i])
+                merged['line_num'].append(data['line_num'][i])
+
+        return merged, round(rect.height * zoom)
+
+    def convert_with_text_layer(self, page, lang, dpi=150, enhance=False, binarize=False):
+        """
+        Searchable copy of a page that keeps the original page content and adds
+        the OCR words as an invisible text layer. Used for oversized pages (OCR'd
+        in tiles) and for binarized OCR, whose 1-bit image is only Tesseract input.
+        """
+        data, _ = self.ocr_page_data(page, lang, dpi=dpi, binarize=binarize, enhance=enhance)
+        zoom = dpi / 72
+
+        ocr_pdf = fitz.open()
+        ocr_pdf.insert_pdf(page.parent, from_page=page.number, to_page=page.number)
+        out_page = ocr_pdf[0]
+
+        for i, text in enumerate(data['text']):
+            text = text.strip()
+            if not text or float(data['conf'][i]) < 0:
+                continue
+            x0 = page.rect.x0 + data['left'][i] / zoom
+            y1 = page.rect.y0 + (data['top'][i] + data['height'][i]) / zoom
+            size = max(data['height'][i] / zoom, 1)
+            # Word boxes are in rotated (displayed) coordinates; insertion is not
+            point = fitz.Point(x0, y1 - size * 0.2) * out_page.derotation_matrix
+            out_page.insert_text(point, text, fontsize=size, render_mode=3, # invisible
+                                 fontname="japan" if CJK_PATTERN.search(text) else "helv",
+                                 rotate=out_page.rotation)
+        return ocr_pdf
+
+    def lang_from_text(self, text):
+        """
+        Picks an OCR language from the Unicode ranges of existing text.
+        Returns None if there is too little text to decide.
+        """
+        cjk = len(CJK_PATTERN.findall(text))
+        latin = len(LATIN_PATTERN.findall(text))
+        if cjk + latin < MIN_ROUTING_CHARS:
+            return None
+        if cjk and latin:
+            return 'jpn+eng'
+        return 'jpn' if cjk else 'eng'
+
+    def lang_from_osd(self, osd):
+        """
+        Picks an OCR language from the script reported by Tesseract OSD.
+        OSD cannot tell whether Latin text is mixed in, so CJK keeps 'jpn+eng'.
+        """
+        script = re.search(r'(?<=Script: )\w+', osd)
+        conf = re.search(r'(?<=Script confidence: )[\d.]+', osd)
+        if not script or not conf or float(conf.group(0)) < MIN_SCRIPT_CONF:
+            return None
+        if script.group(0) == 'Latin':
+            return 'eng'
+        if script.group(0) in CJK_SCRIPTS:
+            return 'jpn+eng'
+        return None
+
+    def route_ocr_lang(self, page, osd_lang=None):
+        """
+        Chooses the cheapest sufficient Tesseract model for a page:
+        configured override, then native text, then the OSD script.
+        """
+        if self.ocr_lang:
+            return self.ocr_lang
+        lang = self.lang_from_text(page.get_text()) or osd_lang or DEFAULT_OCR_LANG
+        logger.info(f"  OCR language: {lang}")
+        return lang
+
+    def convert_to_searchable_pdf(self, page, enhance=False, binarize=False, lang=None):
         """
         Converts a single PDF page to a 1-page searchable PDF document using OCR.
         Returns a fitz.Document object of that single page.
         """
         try:
-            # 1. Get high-res image (reduced to 150 for Render memory limits)
-            pix = page.get_pixmap(dpi=150)
-            img = Image.frombytes("RGB", [pix.width, pix.height], pix.samples)
-            
-            # 2. Enhance if requested
-            if enhance:
-                img = self.enhance_page_image(img)
+            lang = lang or self.route_ocr_lang(page)
+
+            if binarize or self.is_oversized(page, 150):
+                return self.convert_with_text_layer(page, lang, dpi=150, enhance=enhance, binarize=binarize)
+
+            # 1-2. Get high-res image (reduced to 150 for Render memory limits),
+            # enhanced if requested
+            img = self.render_ocr_image(page, dpi=150, enhance=enhance)
             
             # 3. generate PDF with text layer
-            pdf_bytes = pytesseract.image_to_pdf_or_hocr(img, extension='pdf', lang='jpn+eng')
+            pdf_bytes = pytesseract.image_to_pdf_or_hocr(img, extension='pdf', lang=lang)
             
             # 4. Open as fitz doc
             ocr_pdf = fitz.open("pdf", pdf_bytes)
@@ -51,12 +283,57 @@ class PDFProcessor:
             logger.error(f"Failed to convert to searchable PDF: {e}")
             return None
 
+    def classify_page(self, page):
+        """
+        Classifies a page as born-digital, scanned or mixed using cheap
+        PyMuPDF signals: text coverage, image area fraction and fonts.
+        Scanned pages (no text layer, or a page-sized image carrying only a
+        small stamp such as a fax header) need OCR.
+        """
+        try:
+            # Block and image bboxes are unrotated; page.rect is not
+            bounds = page.rect * page.derotation_matrix
+            page_area = abs(bounds) or 1.0
+
+            text_chars = 0
+            text_area = 0.0
+            for block in page.get_text("blocks"):
+                if block[6] != 0: continue # image block
+                text_chars += len(block[4].strip())
+                text_area += abs(fitz.Rect(block[:4]) & bounds)
+
+            image_area = 0.0
+            for info in page.get_image_info():
+                image_area += abs(fitz.Rect(info["bbox"]) & bounds)
+            image_fraction = min(image_area / page_area, 1.0)
+
+            has_text = text_chars >= MIN_TEXT_CHARS and len(page.get_fonts()) > 0
+            text_coverage = min(text_area / page_area, 1.0)
+            image_dominant = image_fraction >= IMAGE_PAGE_FRACTION
+
+            if not has_text or (image_dominant and text_coverage < MIN_TEXT_COVERAGE):
+                page_type = PAGE_SCANNED
+            elif not image_dominant:
+                page_type = PAGE_BORN_DIGITAL
+            else:
+                page_type = PAGE_MIXED
+
+            logger.info(f"  Page type: {page_type} (chars={text_chars}, "
+                        f"text={text_coverage:.0%}, images={image_fraction:.0%})")
+            return page_type
+        except Exception as e:
+            logger.warning(f"Page classification failed, assuming scanned: {e}")
+            return PAGE_SCANNED
+
     def detect_blank_page(self, page, threshold=99.5):
         """
         Detects if a page is blank based on image statistics.
         Returns True if blank, False otherwise.
         """
         try:
+            if self.is_oversized(page, 72):
+                return self.detect_blank_page_tiled(page)
+
             pix = page.get_pixmap(dpi=72)
             img = Image.frombytes("RGB", [pix.width, pix.height], pix.samples)
             
@@ -81,26 +358,62 @@ class PDFProcessor:
             logger.error(f"Error checking blank page: {e}")
             return False
 
+    def detect_blank_page_tiled(self, page):
+        """
+        Blank check for oversized pages: statistics are accumulated over
+        non-overlapping tiles so the whole page is never rasterized at once.
+        Sums come from a 256-bin histogram of each tile, so no widened copy
+        of the pixels is made and the totals are exact.
+        """
+        levels = np.arange(256, dtype=np.int64)
+        count = 0
+        total = 0
+        total_sq = 0
+        for tile, _ in self.tile_rects(page, 72, overlap=0):
+            pix = page.get_pixmap(dpi=72, colorspace=fitz.csGRAY, clip=tile)
+            gray = Image.frombytes("L", [pix.width, pix.height], pix.samples)
+            del pix
+            hist = np.array(gray.histogram(), dtype=np.int64)
+            count += int(hist.sum())
+            total += int(hist @ levels)
+            total_sq += int(hist @ (levels * levels))
+
+        mean = total / count
+        stdev = math.sqrt(max(total_sq - count * mean * mean, 0) / (count - 1))
+
+        is_blank = stdev < 5.0 and mean > 250
+        if is_blank:
+            logger.info(f"Page detected as blank: Mean={mean:.2f}, Stdev={stdev:.2f}")
+        return is_blank
+
     def fix_orientation(self, page):
         """
         Detects orientation and returns the rotation angle (0, 90, 180, 270).
         """
+        return self.detect_osd(page)[0]
+
+    def detect_osd(self, page):
+        """
+        Runs Tesseract OSD once and returns (rotation, osd_lang), where
+        osd_lang is the language suggested by the detected script (or None).
+        """
         try:
-            pix = page.get_pixmap(dpi=150) # Higher DPI for OCR
+            # Higher DPI for OCR; oversized pages are scaled down to the budget
+            pix = page.get_pixmap(dpi=self.fit_dpi(page, 150))
             img = Image.frombytes("RGB", [pix.width, pix.height], pix.samples)
-            
+
             osd = pytesseract.image_to_osd(img)
             rotation = int(re.search(r'(?<=Rotate: )\d+', osd).group(0))
-            
+            osd_lang = self.lang_from_osd(osd)
+
             if rotation != 0:
                 logger.info(f"Detected rotation: {rotation}")
-                return rotation
-            return 0
+            return rotation, osd_lang
         except Exception as e:
             logger.warning(f"OSD failed, assuming 0 rotation. Error: {e}")
-            return 0
+            return 0, None
 
-    def extract_metadata_for_rename(self, page):
+    def extract_metadata_for_rename(self, page, binarize=False, lang=None):
         """
         Extracts potential title and date from the first page.
         Uses OCR with layout analysis if text layer is missing.
@@ -116,13 +429,11 @@ class PDFProcessor:
         if len(text_content.strip()) < 50:
             logger.info("  Low text content detected. Running OCR with layout analysis...")
             try:
-                pix = page.get_pixmap(dpi=150)
-                ocr_height = pix.height
-                img = Image.frombytes("RGB", [pix.width, pix.height], pix.samples)
+                lang = lang or self.route_ocr_lang(page)
                 
                 # Get detailed data (box, conf, height, text)
                 # Output is a dict with lists: 'text', 'height', 'top', 'left', etc.
-                data = pytesseract.image_to_data(img, output_type=pytesseract.Output.DICT, lang='jpn+eng')
+                data, ocr_height = self.ocr_page_data(page, lang, dpi=150, binarize=binarize)
                 
                 # Reconstruct full text for date search
                 full_text_for_date = " ".join([t for t in data['text'] if t.strip()])
@@ -0,0 +1,156 @@
+import os
+import queue
+from concurrent.futures import Future
+import socket
+import threading
+import logging
+
+logger = logging.getLogger(__name__)
+
+# PyMuPDF objects must not be shared across threads, so the I/O threads only
+# move bytes: the reader loads whole files into memory (fitz.open("pdf", data)
+# is then cheap), the writer stores bytes from Document.tobytes().
+
+_DONE = object()
+
+class PrefetchReader:
+    """
+    Reads the next input files in a background thread.
+    Iterating yields (path, data); data is None if the read failed.
+    At most `prefetch` files are held in memory ahead of the consumer.
+    An unexpected error in the reader (e.g. a bad path) is re-raised in the
+    consumer. Call close() when the consumer stops early.
+    """
+    def __init__(self, paths, prefetch=2):
+        self.paths = paths # any iterable, e.g. a live queue of watcher events
+        self.queue = queue.Queue(maxsize=prefetch)
+        self.stop_event = threading.Event()
+        self.error = None
+        self.thread = threading.Thread(target=self._run, daemon=True)
+        self.thread.start()
+
+    def _run(self):
+        try:
+            for path in self.paths:
+                if self.stop_event.is_set():
+                    return
+                try:
+                    with open(path, "rb") as f:
+                        data = f.read()
+                except OSError as e:
+                    logger.error(f"Failed to read {path}: {e}")
+                    data = None
+                if not self._put((path, data)):
+                    return
+        except Exception as e:
+            self.error = e
+        finally:
+            # Always end the stream, or the consumer would wait forever
+            self._put(_DONE)
+
+    def _put(self, item):
+        """
+        Waits for room in the queue; returns False once the reader is closed.
+        """
+        while not self.stop_event.is_set():
+            try:
+                self.queue.put(item, timeout=0.5)
+                return True
+            except queue.Full:
+                pass
+        return False
+
+    def __iter__(self):
+        while True:
+            item = self.queue.get()
+            if item is _DONE:
+                if self.error:
+                    raise self.error
+                return
+            yield item
+
+    def close(self):
+        """
+        Stops reading ahead and drops prefetched data. The thread exits at its
+        next read or within one put timeout.
+        """
+        self.stop_event.set()
+        while True:
+            try:
+                self.queue.get_nowait()
+            except queue.Empty:
+                return
+
+class BackgroundWriter:
+    """
+    Saves documents in a background thread: bytes are written to a temp file
+    next to the target and published with an atomic rename.
+    submit() blocks once `max_pending` outputs are waiting.
+    """
+    def __init__(self, max_pending=2):
+        self.queue = queue.Queue(maxsize=max_pending)
+        self.thread = threading.Thread(target=self._run, daemon=True)
+        self.thread.start()
+
+    def submit(self, path, data, check=None, on_done=None):
+        """
+        Queues data for path. check() is called right before publishing
+        (returning False discards the output); on_done(path) after publishing.
+        Returns a Future that resolves to path once it is published, or to
+        None if the output was discarded or could not be saved.
+        """
+        future = Future()
+        self.queue.put((path, data, check, on_done, future))
+        return future
+
+    def _run(self):
+        while True:
+            item = self.queue.get()
+            if item is _DONE:
+                return
+            path, data, check, on_done, future = item
+            try:
+                published = write_atomic(path, data, check)
+            except Exception as e:
+                logger.error(f"Failed to save {path}: {e}")
+                published = False
+            future.set_result(path if published else None)
+            if published and on_done:
+                try:
+                    on_done(path)
+                except Exception as e:
+                    logger.error(f"Post-save step for {path} failed: {e}")
+
+    def close(self):
+        """
+        Waits for all queued outputs to be written.
+        """
+        self.queue.put(_DONE)
+        self.thread.join()
+
+def write_atomic(path, data, check=None):
+    """
+    Writes data to a temp file in the target directory, then renames it into place.
+    Returns False (and writes nothing) if check() says the output is no longer wanted.
+    """
+    dirname, filename = os.path.split(path)
+    # Unique per host/process/thread: the target may be a shared network directory
+    owner = f"{socket.gethostname()}-{os.getpid()}-{threading.get_ident()}"
+    tmp_path = os.path.join(dirname, f".{filename}.{owner}.tmp")
+    try:
+        with open(tmp_path, "wb") as f:
+            f.write(data)
+
+        if check and not check():
+            os.remove(tmp_path)
+            return False
+
+        os.replace(tmp_path, path)
+    except Exception:
+        # Don't leave a partial temp file behind (e.g. disk full)
+        try:
+            os.remove(tmp_path)
+        except OSError:
+            pass
+        raise
+    return True
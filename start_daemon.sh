@@ -0,0 +1,12 @@
+#!/bin/bash
+cd "$(dirname "$0")"
+
+if [ -d "venv" ]; then
+    source venv/bin/activate
+else
+    echo "Error: Virtual environment not found."
+    exit 1
+fi
+
+echo "Starting PDF Tool Daemon..."
+python main.py --daemon
@@ -9,4 +9,4 @@ else
 fi
 
 echo "Starting Folder Watcher..."
-python watcher.py
+python watcher.py "$@"
@@ -19,8 +19,16 @@ document.addEventListener('DOMContentLoaded', () => {
         e.preventDefault();
         dropZone.classList.remove('dragover');
 
-        if (e.dataTransfer.files.length > 0) {
-            handleFile(e.dataTransfer.files[0]);
+        // Entries must be taken synchronously; folders are read recursively
+        const entries = Array.from(e.dataTransfer.items || [])
+            .map(item => item.webkitGetAsEntry && item.webkitGetAsEntry())
+            .filter(entry => entry);
+
+        if (entries.length > 0) {
+            Promise.all(entries.map(readEntry))
+                .then(lists => handleFiles(lists.flat()));
+        } else if (e.dataTransfer.files.length > 0) {
+            handleFiles(Array.from(e.dataTransfer.files));
         }
     });
 
@@ -31,7 +39,7 @@ document.addEventListener('DOMContentLoaded', () => {
 
     fileInput.addEventListener('change', (e) => {
         if (e.target.files.length > 0) {
-            handleFile(e.target.files[0]);
+            handleFiles(Array.from(e.target.files));
         }
     });
 
@@ -42,10 +50,113 @@ document.addEventListener('DOMContentLoaded', () => {
         dropZone.innerHTML = dropZoneContent; // Restore icon
         statusContainer.classList.add('hidden');
         fileInput.value = '';
+
+        const downloadBtn = document.getElementById('download-btn');
+        if (downloadBtn.href.startsWith('blob:')) {
+            URL.revokeObjectURL(downloadBtn.href);
+        }
+        downloadBtn.removeAttribute('download');
     });
 
+    // Resolves a dropped file or folder entry to a flat list of Files
+    function readEntry(entry) {
+        if (entry.isFile) {
+            return new Promise(resolve => entry.file(resolve, () => resolve([])));
+        }
+        if (entry.isDirectory) {
+            const reader = entry.createReader();
+            const entries = [];
+            // readEntries returns results in chunks until an empty batch
+            return new Promise(resolve => {
+                const readBatch = () => reader.readEntries(batch => {
+                    if (batch.length === 0) {
+                        Promise.all(entries.map(readEntry)).then(lists => resolve(lists.flat()));
+                    } else {
+                        entries.push(...batch);
+                        readBatch();
+                    }
+                }, () => resolve([]));
+                readBatch();
+            });
+        }
+        return Promise.resolve([]);
+    }
+
+    function isPdf(file) {
+        return file.type === 'application/pdf' || file.name.toLowerCase().endsWith('.pdf');
+    }
+
+    function isZip(file) {
+        return file.name.toLowerCase().endsWith('.zip');
+    }
+
+    function handleFiles(files) {
+        const accepted = files.filter(file => isPdf(file) || isZip(file));
+        if (accepted.length === 0) {
+            alert('PDFファイル(またはZIP)のみ対応しています。');
+            return;
+        }
+
+        // A single PDF keeps the simple flow; anything else goes in one batch request
+        if (accepted.length === 1 && isPdf(accepted[0])) {
+            handleFile(accepted[0]);
+        } else {
+            handleBatch(accepted);
+        }
+    }
+
+    function appendOptions(formData) {
+        const makeSearchable = document.getElementById('make-searchable').checked;
+        const enhanceImage = document.getElementById('enhance-image').checked;
+        const binarizeImage = document.getElementById('binarize-image').checked;
+
+        formData.append('searchable', makeSearchable);
+        formData.append('enhance', enhanceImage);
+        formData.append('binarize', binarizeImage);
+    }
+
+    function handleBatch(files) {
+        // Show loading state
+        dropZone.classList.add('hidden');
+        statusContainer.classList.remove('hidden');
+        document.getElementById('status-text').textContent = `Processing ${files.length} files...`;
+
+        const formData = new FormData();
+        files.forEach(file => formData.append('files', file));
+        appendOptions(formData);
+
+        fetch('/upload_batch', {
+            method: 'POST',
+            body: formData
+        })
+            .then(response => {
+                if (!response.ok) {
+                    return response.json().then(data => { throw new Error(data.error); });
+                }
+                return response.blob();
+            })
+            .then(blob => {
+                statusContainer.classList.add('hidden');
+                document.getElementById('status-text').textContent = 'Processing...';
+
+                // Show result
+                const downloadBtn = document.getElementById('download-btn');
+                resultContainer.classList.remove('hidden');
+                document.getElementById('new-filename').textContent = 'processed.zip';
+                downloadBtn.href = URL.createObjectURL(blob);
+                downloadBtn.setAttribute('download', 'processed.zip');
+            })
+            .catch(error => {
+                console.error('Error:', error);
+                statusContainer.classList.add('hidden');
+                document.getElementById('status-text').textContent = 'Processing...';
+                dropZone.classList.remove('hidden');
+                alert('エラー: ' + error.message);
+            });
+    }
+
     function handleFile(file) {
-        if (file.type !== 'application/pdf') {
+        if (!isPdf(file)) {
             alert('PDFファイルのみ対応しています。');
             return;
         }
@@ -58,11 +169,7 @@ document.addEventListener('DOMContentLoaded', () => {
         formData.append('file', file);
 
         // Add options
-        const makeSearchable = document.getElementById('make-searchable').checked;
-        const enhanceImage = document.getElementById('enhance-image').checked;
-
-        formData.append('searchable', makeSearchable);
-        formData.append('enhance', enhanceImage);
+        appendOptions(formData);
 
         fetch('/upload', {
             method: 'POST',
@@ -1,22 +1,39 @@
 import time
 import os
+import queue
 import shutil
+import socket
+import threading
+import uuid
+import argparse
 import logging
 from watchdog.observers import Observer
 from watchdog.events import FileSystemEventHandler
 from main import process_single_pdf
 from pdf_processor import PDFProcessor
+from pipeline import PrefetchReader, BackgroundWriter, write_atomic
 
-# Configuration
-INPUT_DIR = "input"
-PROCESSED_DIR = "processed"
+# Configuration (override via environment, e.g. paths on a shared NFS mount)
+INPUT_DIR = os.environ.get("PDF_INPUT_DIR", "input")
+PROCESSED_DIR = os.environ.get("PDF_PROCESSED_DIR", "processed")
+
+# Cluster (multi-node spool) mode
+WORK_DIR = os.path.join(INPUT_DIR, ".work")      # per-node claimed files
+FAILED_DIR = os.path.join(INPUT_DIR, ".failed")  # files that could not be processed
+HEARTBEAT_FILE = ".heartbeat"
+HEARTBEAT_INTERVAL = 10 # seconds
+LEASE_TTL = 60          # a node whose heartbeat is older than this is considered dead
+POLL_INTERVAL = 2
+SETTLE_SECONDS = 2      # ignore files still being written
 
 logging.basicConfig(level=logging.INFO, format='%(asctime)s - %(message)s')
 logger = logging.getLogger(__name__)
 
 class PDFHandler(FileSystemEventHandler):
-    def __init__(self, processor):
+    def __init__(self, processor, writer=None):
         self.processor = processor
+        self.writer = writer # BackgroundWriter for pipelined saves (optional)
+        self.queue = queue.Queue() # detected files, consumed by start_watching
 
     def on_created(self, event):
         if event.is_directory:
@@ -30,9 +47,15 @@ class PDFHandler(FileSystemEventHandler):
         time.sleep(1)
         
         logger.info(f"New PDF detected: {filename}")
-        self.process_file(event.src_path)
+        self.queue.put(event.src_path)
 
-    def process_file(self, filepath):
+    def process_file(self, filepath, still_owned=None, data=None):
+        """
+        Processes filepath (or its prefetched bytes in data) and publishes
+        the result to PROCESSED_DIR atomically.
+        still_owned (cluster mode) is checked before publishing so a node
+        that lost its lease never publishes a file another node re-claimed.
+        """
         try:
             # We need to process the file and save the result to PROCESSED_DIR
             # main.py's logic saves in-place or renames. We want to adapt it slightly.
@@ -57,7 +80,7 @@ class PDFHandler(FileSystemEventHandler):
             filename = os.path.basename(filepath)
             
             # Use the processor directly
-            doc = import_fitz().open(input_path)
+            doc = import_fitz().open("pdf", data) if data else import_fitz().open(input_path)
             out_doc = import_fitz().open()
             
             needs_rename = import_utils().is_generic_filename(filename)
@@ -69,12 +92,14 @@ class PDFHandler(FileSystemEventHandler):
                 if self.processor.detect_blank_page(page):
                      continue
                 
+                rotation, osd_lang = self.processor.detect_osd(page)
+
                 if pages_kept == 0 and needs_rename:
-                    t, d = self.processor.extract_metadata_for_rename(page)
+                    lang = self.processor.route_ocr_lang(page, osd_lang)
+                    t, d = self.processor.extract_metadata_for_rename(page, lang=lang)
                     if t: new_title = t
                     if d: new_date = d
                     
-                rotation = self.processor.fix_orientation(page)
                 if rotation != 0:
                     page.set_rotation(rotation)
                 
@@ -99,15 +124,23 @@ class PDFHandler(FileSystemEventHandler):
                     
             output_path = os.path.join(PROCESSED_DIR, final_name)
             
-            # Save
-            out_doc.save(output_path)
-            logger.info(f"Processed and saved to: {output_path}")
+            out_data = out_doc.tobytes()
             out_doc.close()
             doc.close()
-            
-            # Clean up input file
-            os.remove(input_path)
-            logger.info(f"Removed original file from input.")
+
+            def published(path):
+                logger.info(f"Processed and saved to: {path}")
+                # Clean up input file
+                os.remove(input_path)
+                logger.info(f"Removed original file from input.")
+
+            # Save to a temp name, then publish with an atomic rename
+            if self.writer:
+                self.writer.submit(output_path, out_data, check=still_owned, on_done=published)
+            elif write_atomic(output_path, out_data, still_owned):
+                published(output_path)
+            else:
+                logger.warning(f"Lease on {filename} lost. Discarding result.")
 
         except Exception as e:
             logger.error(f"Error processing {filepath}: {e}")
@@ -121,6 +154,202 @@ def import_utils():
     import utils
     return utils
 
+class SpoolWorker:
+    """
+    One node of a multi-node watcher sharing INPUT_DIR over a network filesystem.
+    Files are claimed by atomic rename into a new slot directory under
+    WORK_DIR/<node_id> (one file per slot, so same-named files never replace
+    each other); a heartbeat file in that directory is the node's lease.
+    Files of nodes whose heartbeat expired are re-claimed the same way, so
+    each file has exactly one owner.
+    """
+    def __init__(self, processor, node_id=None):
+        self.handler = PDFHandler(processor)
+        self.node_id = node_id or f"{socket.gethostname()}-{os.getpid()}"
+        self.node_dir = os.path.join(WORK_DIR, self.node_id)
+        self.heartbeat_path = os.path.join(self.node_dir, HEARTBEAT_FILE)
+        self.stop_event = threading.Event()
+
+    def heartbeat(self):
+        """
+        Refreshes the lease and returns the file server's notion of "now"
+        (mtimes are set by the server, so node clocks need not agree).
+        """
+        os.makedirs(self.node_dir, exist_ok=True)
+        with open(self.heartbeat_path, "a"):
+            os.utime(self.heartbeat_path)
+        return os.stat(self.heartbeat_path).st_mtime
+
+    def heartbeat_loop(self):
+        while not self.stop_event.wait(HEARTBEAT_INTERVAL):
+            try:
+                self.heartbeat()
+            except OSError as e:
+                logger.error(f"Heartbeat failed: {e}")
+
+    def claim(self, src_path):
+        slot = os.path.join(self.node_dir, uuid.uuid4().hex)
+        os.mkdir(slot)
+        dst_path = os.path.join(slot, os.path.basename(src_path))
+        try:
+            os.rename(src_path, dst_path) # atomic: only one node wins
+        except OSError:
+            remove_empty_dir(slot)
+            return None # claimed by another node (or vanished)
+        return dst_path
+
+    def claim_next(self, now):
+        try:
+            filenames = sorted(os.listdir(INPUT_DIR))
+        except OSError as e:
+            logger.error(f"Cannot list {INPUT_DIR}: {e}")
+            return None
+        for filename in filenames:
+            if not filename.lower().endswith(".pdf"):
+                continue
+            path = os.path.join(INPUT_DIR, filename)
+            try:
+                if now - os.stat(path).st_mtime < SETTLE_SECONDS:
+                    continue # still being written
+            except OSError:
+                continue
+            claimed = self.claim(path)
+            if claimed:
+                return claimed
+        return None
+
+    def recover_expired(self, now):
+        """
+        Re-claims files held by nodes whose lease expired (crashed nodes).
+        """
+        try:
+            node_ids = os.listdir(WORK_DIR)
+        except OSError as e:
+            logger.error(f"Cannot list {WORK_DIR}: {e}")
+            return
+        for node_id in node_ids:
+            if node_id == self.node_id:
+                continue
+            try:
+                self.recover_node(node_id, now)
+            except FileNotFoundError:
+                pass # already recovered by another node
+            except OSError as e:
+                logger.error(f"Recovery of node {node_id} failed: {e}")
+
+    def recover_node(self, node_id, now):
+        node_dir = os.path.join(WORK_DIR, node_id)
+        if not os.path.isdir(node_dir):
+            return
+        try:
+            lease = os.stat(os.path.join(node_dir, HEARTBEAT_FILE)).st_mtime
+        except OSError:
+            lease = os.stat(node_dir).st_mtime
+        if now - lease < LEASE_TTL:
+            return
+
+        for slot in os.listdir(node_dir):
+            slot_dir = os.path.join(node_dir, slot)
+            if not os.path.isdir(slot_dir):
+                continue
+            for filename in os.listdir(slot_dir):
+                if filename.lower().endswith(".pdf") and self.claim(os.path.join(slot_dir, filename)):
+                    logger.info(f"Re-claimed {filename} from expired node {node_id}")
+            remove_empty_dir(slot_dir)
+        try:
+            os.remove(os.path.join(node_dir, HEARTBEAT_FILE))
+        except OSError:
+            pass # no heartbeat, or another node is cleaning up
+        remove_empty_dir(node_dir)
+
+    def pending(self):
+        paths = []
+        for slot in sorted(os.listdir(self.node_dir)):
+            slot_dir = os.path.join(self.node_dir, slot)
+            if os.path.isdir(slot_dir):
+                paths += [os.path.join(slot_dir, f) for f in sorted(os.listdir(slot_dir))
+                          if f.lower().endswith(".pdf")]
+        return paths
+
+    def process(self, path):
+        self.handler.process_file(path, still_owned=lambda: os.path.exists(path))
+        if os.path.exists(path):
+            # Failed or all pages blank: park it so no node retries it forever
+            os.makedirs(FAILED_DIR, exist_ok=True)
+            failed_path = move_no_replace(path, FAILED_DIR)
+            logger.warning(f"Moved {os.path.basename(path)} to {failed_path}")
+        remove_empty_dir(os.path.dirname(path))
+
+    def run(self):
+        self.heartbeat()
+        heartbeat_thread = threading.Thread(target=self.heartbeat_loop, daemon=True)
+        heartbeat_thread.start()
+        logger.info(f"Node {self.node_id} polling '{INPUT_DIR}' (lease TTL {LEASE_TTL}s)")
+
+        try:
+            while True:
+                try:
+                    now = self.heartbeat()
+                    self.recover_expired(now)
+                    # Re-claimed files first, then new input
+                    path = next(iter(self.pending()), None) or self.claim_next(now)
+                    if path:
+                        logger.info(f"Claimed: {os.path.basename(path)}")
+                        self.process(path)
+                        continue
+                except OSError as e:
+                    # Transient network filesystem errors must not end the node
+                    logger.error(f"Poll failed: {e}")
+                time.sleep(POLL_INTERVAL)
+        except KeyboardInterrupt:
+            pass
+        finally:
+            self.stop_event.set()
+            heartbeat_thread.join()
+            try:
+                if self.pending():
+                    # Hand unfinished files to the other nodes by expiring the lease
+                    # now; they re-claim them into their own slots, so nothing is
+                    # overwritten (moving them back to INPUT_DIR could be)
+                    os.utime(self.heartbeat_path, (0, 0))
+                else:
+                    for slot in os.listdir(self.node_dir):
+                        remove_empty_dir(os.path.join(self.node_dir, slot))
+                    os.remove(self.heartbeat_path)
+                    os.rmdir(self.node_dir)
+            except OSError:
+                pass
+
+def remove_empty_dir(path):
+    try:
+        os.rmdir(path)
+    except OSError:
+        pass # not empty, or already removed
+
+def move_no_replace(src_path, dst_dir):
+    """
+    Moves src_path into dst_dir without replacing an existing file: os.link
+    fails if the name is taken, in which case a numbered name is used.
+    Returns the new path.
+    """
+    name, ext = os.path.splitext(os.path.basename(src_path))
+    dst_path = os.path.join(dst_dir, name + ext)
+    n = 2
+    while True:
+        try:
+            os.link(src_path, dst_path)
+            break
+        except FileExistsError:
+            dst_path = os.path.join(dst_dir, f"{name} ({n}){ext}")
+            n += 1
+    os.remove(src_path)
+    return dst_path
+
+def start_cluster_worker(node_id=None):
+    for d in (INPUT_DIR, PROCESSED_DIR, WORK_DIR):
+        os.makedirs(d, exist_ok=True)
+    SpoolWorker(PDFProcessor(), node_id).run()
+
 def start_watching():
     if not os.path.exists(INPUT_DIR):
         os.makedirs(INPUT_DIR)
@@ -128,7 +357,8 @@ def start_watching():
         os.makedirs(PROCESSED_DIR)
         
     processor = PDFProcessor()
-    event_handler = PDFHandler(processor)
+    writer = BackgroundWriter()
+    event_handler = PDFHandler(processor, writer)
     observer = Observer()
     observer.schedule(event_handler, INPUT_DIR, recursive=False)
     observer.start()
@@ -137,12 +367,26 @@ def start_watching():
     logger.info(f"Processed files will be saved to '{PROCESSED_DIR}'")
     logger.info("Press Ctrl+C to stop.")
     
+    # Pipeline: the next detected file is read while the current one is processed
+    reader = PrefetchReader(iter(event_handler.queue.get, None))
     try:
-        while True:
-            time.sleep(1)
+        for path, data in reader:
+            event_handler.process_file(path, data=data)
     except KeyboardInterrupt:
         observer.stop()
+    finally:
+        reader.close()
     observer.join()
+    writer.close()
 
 if __name__ == "__main__":
-    start_watching()
+    parser = argparse.ArgumentParser(description="PDF folder watcher")
+    parser.add_argument("--cluster", action="store_true",
+                        help="Share INPUT_DIR with other nodes (leased spool, polling)")
+    parser.add_argument("--node-id", help="Unique node name (default: host-pid)")
+    args = parser.parse_args()
+
+    if args.cluster:
+        start_cluster_worker(args.node_id)
+    else:
+        start_watching()